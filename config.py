@@ -174,6 +174,20 @@ async def get_auto_ban_error_codes() -> list:
     return AUTO_BAN_ERROR_CODES
 
 
+# 布尔环境变量解析缓存：按原始字符串记忆解析结果，
+# 热路径上每次调用只剩一次字典查找（环境变量取值种类有限，不会膨胀）
+_BOOL_ENV_TRUE_VALUES = frozenset(("true", "1", "yes", "on"))
+_bool_env_cache: dict = {}
+
+
+def _parse_bool_env(env_value: str) -> bool:
+    """解析布尔型环境变量字符串，结果按原始值缓存"""
+    cached = _bool_env_cache.get(env_value)
+    if cached is None:
+        cached = _bool_env_cache[env_value] = env_value.lower() in _BOOL_ENV_TRUE_VALUES
+    return cached
+
+
 async def get_antigravity_skip_project_verification() -> bool:
     """
     获取 Antigravity 跳过项目验证配置
@@ -190,7 +204,7 @@ async def get_antigravity_skip_project_verification() -> bool:
     """
     env_value = os.getenv("ANTIGRAVITY_SKIP_PROJECT_VERIFICATION")
     if env_value:
-        return env_value.lower() in ("true", "1", "yes", "on")
+        return _parse_bool_env(env_value)
 
     # 检查 TOML 配置
     value = await get_config_value("antigravity_skip_project_verification")
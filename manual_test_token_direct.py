@@ -2,43 +2,56 @@
 直接测试 Antigravity token 是否有效
 """
 import asyncio
+import traceback
 import toml
 import httpx
 import json
 
-
-async def test_token(access_token: str, email: str):
-    """测试单个 token"""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# API 配置（从 Node.js 版本复制）
+API_URL = "https://daily-cloudcode-pa.sandbox.googleapis.com/v1internal:streamGenerateContent?alt=sse"
+API_HOST = "daily-cloudcode-pa.sandbox.googleapis.com"
+USER_AGENT = "antigravity/1.11.3 windows/amd64"
+
+# 简单的测试请求体：所有账户共用同一份，进程内只序列化一次
+REQUEST_BODY = {
+    "model_id": "gemini-3-pro-high",
+    "messages": [
+        {"role": "user", "content": "你好"}
+    ],
+    "parameters": {
+        "temperature": 1.0,
+        "max_tokens": 50
+    },
+    "system_instruction": "你是一个有帮助的AI助手。"
+}
+
+REQUEST_BODY_BYTES = (
+    orjson.dumps(REQUEST_BODY) if orjson else json.dumps(REQUEST_BODY).encode("utf-8")
+)
+
+
+async def test_token(client: httpx.AsyncClient, access_token: str, email: str):
+    """测试单个 token（复用外部传入的共享 client）"""
     print(f"\n{'='*60}")
     print(f"测试账户: {email}")
     print(f"Token 前缀: {access_token[:50]}...")
     print('='*60)
 
-    # API 配置（从 Node.js 版本复制）
-    api_url = "https://daily-cloudcode-pa.sandbox.googleapis.com/v1internal:streamGenerateContent?alt=sse"
-    api_host = "daily-cloudcode-pa.sandbox.googleapis.com"
-    user_agent = "antigravity/1.11.3 windows/amd64"
+    api_url = API_URL
 
     # 请求头（完全按照 Node.js 版本）
     headers = {
-        'Host': api_host,
-        'User-Agent': user_agent,
+        'Host': API_HOST,
+        'User-Agent': USER_AGENT,
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json',
-        'Accept-Encoding': 'gzip'
-    }
-
-    # 简单的测试请求体
-    request_body = {
-        "model_id": "gemini-3-pro-high",
-        "messages": [
-            {"role": "user", "content": "你好"}
-        ],
-        "parameters": {
-            "temperature": 1.0,
-            "max_tokens": 50
-        },
-        "system_instruction": "你是一个有帮助的AI助手。"
+        # 探测只读响应开头，identity 避免服务端压缩+本地解压的纯开销
+        'Accept-Encoding': 'identity'
     }
 
     try:
@@ -46,26 +59,32 @@ async def test_token(access_token: str, email: str):
         print(f"URL: {api_url}")
         print(f"Headers: {json.dumps({k: v if k != 'Authorization' else f'Bearer {access_token[:20]}...' for k, v in headers.items()}, indent=2)}")
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(api_url, json=request_body, headers=headers)
-
+        # 流式读取：有效性判定只需要状态码和响应开头，
+        # 读满约1KB即断开，避免下载并解压整个SSE响应
+        async with client.stream(
+            "POST", api_url, content=REQUEST_BODY_BYTES, headers=headers
+        ) as response:
             print(f"\n响应状态码: {response.status_code}")
 
+            first_chunk = b""
+            async for chunk in response.aiter_bytes():
+                first_chunk += chunk
+                if len(first_chunk) >= 1024:
+                    break
+
+            preview = first_chunk.decode("utf-8", errors="replace")
+
             if response.status_code == 200:
                 print("✅ Token 有效！")
-                # 读取前几行响应
-                content = response.text[:500]
-                print(f"\n响应前 500 字符:\n{content}")
+                print(f"\n响应前 500 字符:\n{preview[:500]}")
                 return True
             else:
                 print(f"❌ Token 无效或有错误")
-                error_text = response.text
-                print(f"\n错误响应:\n{error_text}")
+                print(f"\n错误响应:\n{preview}")
                 return False
 
     except Exception as e:
         print(f"❌ 请求异常: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -83,22 +102,33 @@ async def main():
     accounts = accounts_data.get('accounts', [])
     print(f"\n找到 {len(accounts)} 个账户")
 
-    results = []
-    for i, account in enumerate(accounts):
-        email = account.get('email', f'Account {i+1}')
-        access_token = account.get('access_token')
-        disabled = account.get('disabled', False)
-
-        if disabled:
-            print(f"\n[{i+1}] {email}: SKIP (已禁用)")
-            continue
-
-        if not access_token:
-            print(f"\n[{i+1}] {email}: SKIP (无 access_token)")
-            continue
-
-        result = await test_token(access_token, email)
-        results.append((email, result))
+    # 预筛选：单次推导式筛出可测账户，禁用/缺token的不进入并发阶段
+    pending = [
+        (account.get('email', f'Account {i+1}'), account['access_token'])
+        for i, account in enumerate(accounts)
+        if not account.get('disabled', False) and account.get('access_token')
+    ]
+    skipped = len(accounts) - len(pending)
+    if skipped:
+        print(f"跳过 {skipped} 个账户（已禁用或无 access_token）")
+
+    # 并发测试全部账户（信号量限流），墙上时间从各请求之和降为最大值
+    sem = asyncio.Semaphore(8)
+
+    async def guarded(client, access_token, email):
+        async with sem:
+            return await test_token(client, access_token, email)
+
+    # 共享一个 client：所有账户复用同一条 TCP+TLS 连接（keep-alive），
+    # 免去每个账户一次完整握手
+    async with httpx.AsyncClient(
+        timeout=30, limits=httpx.Limits(max_keepalive_connections=4)
+    ) as client:
+        outcomes = await asyncio.gather(
+            *(guarded(client, access_token, email) for email, access_token in pending)
+        )
+
+    results = list(zip((email for email, _ in pending), outcomes))
 
     # 汇总结果
     print("\n" + "="*60)
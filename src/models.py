@@ -244,3 +244,18 @@ class CredentialStatus(BaseModel):
     disabled: bool = False
     error_codes: List[int] = []
     last_success: Optional[str] = None
+
+
+# 在导入时构建请求热路径模型的 pydantic-core schema，
+# 避免首个请求承担延迟的 schema 构建开销
+# （pydantic v1 没有 model_rebuild，Termux 部署仍在 v1 上，需跳过）
+for _model in (
+    OpenAIToolFunction,
+    OpenAIToolCall,
+    OpenAITool,
+    OpenAIChatMessage,
+    OpenAIChatCompletionRequest,
+):
+    if hasattr(_model, "model_rebuild"):
+        _model.model_rebuild()
+del _model
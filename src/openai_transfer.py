@@ -4,6 +4,9 @@ OpenAI Transfer Module - Handles conversion between OpenAI and Gemini API format
 """
 
 from logging import INFO, info
+import functools
+import os
+import re
 import time
 import uuid
 import json
@@ -21,142 +24,242 @@ from log import log
 from .models import ChatCompletionRequest
 from .google_chat_api import _merge_safety_settings
 
+# pypinyin 为可选依赖，且其词典数据加载较重：推迟到首次遇到
+# 中文函数名时再导入，避免拖慢模块导入和纯英文工作负载
+_pypinyin_funcs = None  # 未尝试导入为 None；导入失败置为 False
 
-async def openai_request_to_gemini_payload(
-    openai_request: ChatCompletionRequest,
+
+def _load_pypinyin():
+    """按需导入 pypinyin，结果（或失败标记）缓存在模块级"""
+    global _pypinyin_funcs
+    if _pypinyin_funcs is None:
+        try:
+            from pypinyin import lazy_pinyin, Style
+
+            _pypinyin_funcs = (lazy_pinyin, Style)
+        except ImportError:
+            _pypinyin_funcs = False
+    return _pypinyin_funcs
+
+
+# 工具调用参数都是小段JSON，解析/序列化频率高：优先用 orjson（Rust实现，
+# 其 JSONDecodeError 继承自 json.JSONDecodeError，异常处理不受影响）
+try:
+    import orjson as _orjson
+
+    _json_loads = _orjson.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return _orjson.dumps(obj).decode()
+
+    def _canonical_dumps(obj: Any) -> str:
+        """排序键的规范化序列化，用作缓存键"""
+        return _orjson.dumps(obj, option=_orjson.OPT_SORT_KEYS).decode()
+
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+    def _canonical_dumps(obj: Any) -> str:
+        """排序键的规范化序列化，用作缓存键"""
+        return json.dumps(obj, sort_keys=True, ensure_ascii=False)
+
+
+class _ConversionState:
+    """openai_request_to_gemini_payload 消息循环的共享状态"""
+
+    __slots__ = (
+        "contents",
+        "system_instructions",
+        "compatibility_mode",
+        "collecting_system",
+        "prev_was_tool",
+        "all_messages",
+        "id_to_name",
+    )
+
+    def __init__(self, compatibility_mode: bool, all_messages: List, id_to_name: Dict[str, str]):
+        self.contents: List[Dict[str, Any]] = []
+        self.system_instructions: List[str] = []
+        self.compatibility_mode = compatibility_mode
+        # 第一阶段：收集连续的system消息到system_instruction中（除非在兼容性模式下）
+        self.collecting_system = not compatibility_mode
+        self.prev_was_tool = False
+        self.all_messages = all_messages
+        self.id_to_name = id_to_name
+
+
+def _append_message_content(message, role: str, state: _ConversionState) -> None:
+    """处理含 tool_calls 或普通内容的消息并追加到 contents（role 已映射为 Gemini 角色）"""
+    # 检查是否有 tool_calls（assistant 消息中的工具调用）
+    has_tool_calls = hasattr(message, "tool_calls") and message.tool_calls
+
+    if has_tool_calls:
+        # 构建包含 functionCall 的 parts
+        parts = []
+        parsed_count = 0
+
+        # 如果有文本内容，先添加文本
+        if message.content:
+            parts.append({"text": message.content})
+
+        # 添加每个工具调用
+        for tool_call in message.tool_calls:
+            try:
+                # 解析 arguments（OpenAI 格式是 JSON 字符串）
+                raw = tool_call.function.arguments
+                if isinstance(raw, str):
+                    # 异常开销大（栈帧+traceback），先用前缀检查廉价拦截
+                    # 明显非JSON的输入；arguments 合法时总是对象或数组
+                    if raw.lstrip()[:1] not in ("{", "["):
+                        log.error(
+                            "Failed to parse tool call "
+                            f"'{getattr(tool_call.function, 'name', 'unknown')}': "
+                            "arguments is not a JSON object/array"
+                        )
+                        continue
+                    args = _json_loads(raw)
+                else:
+                    args = raw
+                parts.append({"functionCall": {"name": tool_call.function.name, "args": args}})
+                parsed_count += 1
+            except (json.JSONDecodeError, AttributeError) as e:
+                log.error(
+                    f"Failed to parse tool call '{getattr(tool_call.function, 'name', 'unknown')}': {e}"
+                )
+                continue
+
+        # 检查是否至少解析了一个工具调用
+        if parsed_count == 0 and message.tool_calls:
+            log.error(f"All {len(message.tool_calls)} tool calls failed to parse")
+            # 如果没有文本内容且所有工具调用都失败，这是一个严重错误
+            if not message.content:
+                raise ValueError(
+                    f"All {len(message.tool_calls)} tool calls failed to parse and no content available"
+                )
+
+        if parts:
+            state.contents.append({"role": role, "parts": parts})
+        return
+
+    # 处理普通内容
+    if isinstance(message.content, list):
+        parts = []
+        for part in message.content:
+            if part.get("type") == "text":
+                parts.append({"text": part.get("text", "")})
+            elif part.get("type") == "image_url":
+                image_url = part.get("image_url", {}).get("url")
+                if image_url:
+                    # 解析数据URI: "data:image/jpeg;base64,{base64_image}"
+                    try:
+                        mime_type, base64_data = image_url.split(";")
+                        _, mime_type = mime_type.split(":")
+                        _, base64_data = base64_data.split(",")
+                        parts.append(
+                            {
+                                "inlineData": {
+                                    "mimeType": mime_type,
+                                    "data": base64_data,
+                                }
+                            }
+                        )
+                    except ValueError:
+                        continue
+        state.contents.append({"role": role, "parts": parts})
+    elif message.content:
+        # 简单文本内容
+        state.contents.append({"role": role, "parts": [{"text": message.content}]})
+
+
+def _handle_tool_message(message, state: _ConversionState) -> None:
+    """处理工具消息（tool role），不打断 system 消息的收集阶段"""
+    # 转换工具结果消息为 functionResponse
+    # 传递所有消息以便在需要时查找 function name
+    function_response = convert_tool_message_to_function_response(
+        message, all_messages=state.all_messages, id_to_name=state.id_to_name
+    )
+    # Gemini 中工具响应作为 user 消息；并行工具调用产生的连续 tool
+    # 消息合并进同一条 content 的 parts，而不是每条各建一个 content
+    if state.prev_was_tool and state.contents:
+        state.contents[-1]["parts"].append(function_response)
+    else:
+        state.contents.append({"role": "user", "parts": [function_response]})
+    state.prev_was_tool = True
+
+
+def _handle_system_message(message, state: _ConversionState) -> None:
+    """处理系统消息：收集阶段进 systemInstruction，否则降级为 user 消息"""
+    state.prev_was_tool = False
+
+    if state.collecting_system:
+        # 正常模式：仍在收集连续的system消息
+        if isinstance(message.content, str):
+            state.system_instructions.append(message.content)
+        elif isinstance(message.content, list):
+            # 处理列表格式的系统消息
+            for part in message.content:
+                if part.get("type") == "text" and part.get("text"):
+                    state.system_instructions.append(part["text"])
+        return
+
+    # 兼容性模式或收集阶段已结束：system消息转换为user消息
+    _append_message_content(message, "user", state)
+
+
+def _handle_assistant_message(message, state: _ConversionState) -> None:
+    state.prev_was_tool = False
+    state.collecting_system = False
+    _append_message_content(message, "model", state)
+
+
+def _handle_user_message(message, state: _ConversionState) -> None:
+    state.prev_was_tool = False
+    state.collecting_system = False
+    _append_message_content(message, "user", state)
+
+
+def _handle_other_message(message, state: _ConversionState) -> None:
+    """未知角色按原样透传（与历史行为一致）"""
+    state.prev_was_tool = False
+    state.collecting_system = False
+    _append_message_content(message, message.role, state)
+
+
+# 角色分发表：每条消息一次O(1)字典查找，代替逐个角色的链式字符串比较
+_MESSAGE_HANDLERS = {
+    "tool": _handle_tool_message,
+    "system": _handle_system_message,
+    "assistant": _handle_assistant_message,
+    "user": _handle_user_message,
+}
+
+
+def _openai_request_to_gemini_payload_sync(
+    openai_request: ChatCompletionRequest, compatibility_mode: bool
 ) -> Dict[str, Any]:
     """
-    将OpenAI聊天完成请求直接转换为完整的Gemini API payload格式
+    转换的同步核心：纯CPU的消息遍历和字典构建，无任何I/O
 
     Args:
         openai_request: OpenAI格式请求对象
+        compatibility_mode: 是否启用兼容性模式（由调用方预先读取配置）
 
     Returns:
         完整的Gemini API payload，包含model和request字段
     """
-    contents = []
-    system_instructions = []
-
-    # 检查是否启用兼容性模式
-    compatibility_mode = await get_compatibility_mode_enabled()
-
-    # 处理对话中的每条消息
-    # 第一阶段：收集连续的system消息到system_instruction中（除非在兼容性模式下）
-    collecting_system = True if not compatibility_mode else False
+    # 预先建立 tool_call_id -> 函数名 索引：tool 消息缺少 name 时可 O(1) 反查
+    id_to_name = _build_id_to_name_index(openai_request.messages)
 
+    # 处理对话中的每条消息：按角色走分发表
+    state = _ConversionState(compatibility_mode, openai_request.messages, id_to_name)
     for message in openai_request.messages:
-        role = message.role
-
-        # 处理工具消息（tool role）
-        if role == "tool":
-            # 转换工具结果消息为 functionResponse
-            # 传递所有消息以便在需要时查找 function name
-            function_response = convert_tool_message_to_function_response(
-                message, all_messages=openai_request.messages
-            )
-            contents.append(
-                {"role": "user", "parts": [function_response]}  # Gemini 中工具响应作为 user 消息
-            )
-            continue
+        _MESSAGE_HANDLERS.get(message.role, _handle_other_message)(message, state)
 
-        # 处理系统消息
-        if role == "system":
-            if compatibility_mode:
-                # 兼容性模式：所有system消息转换为user消息
-                role = "user"
-            elif collecting_system:
-                # 正常模式：仍在收集连续的system消息
-                if isinstance(message.content, str):
-                    system_instructions.append(message.content)
-                elif isinstance(message.content, list):
-                    # 处理列表格式的系统消息
-                    for part in message.content:
-                        if part.get("type") == "text" and part.get("text"):
-                            system_instructions.append(part["text"])
-                continue
-            else:
-                # 正常模式：后续的system消息转换为user消息
-                role = "user"
-        else:
-            # 遇到非system消息，停止收集system消息
-            collecting_system = False
-
-        # 将OpenAI角色映射到Gemini角色
-        if role == "assistant":
-            role = "model"
-
-        # 检查是否有 tool_calls（assistant 消息中的工具调用）
-        has_tool_calls = hasattr(message, "tool_calls") and message.tool_calls
-
-        if has_tool_calls:
-            # 构建包含 functionCall 的 parts
-            parts = []
-            parsed_count = 0
-
-            # 如果有文本内容，先添加文本
-            if message.content:
-                parts.append({"text": message.content})
-
-            # 添加每个工具调用
-            for tool_call in message.tool_calls:
-                try:
-                    # 解析 arguments（OpenAI 格式是 JSON 字符串）
-                    args = (
-                        json.loads(tool_call.function.arguments)
-                        if isinstance(tool_call.function.arguments, str)
-                        else tool_call.function.arguments
-                    )
-                    parts.append({"functionCall": {"name": tool_call.function.name, "args": args}})
-                    parsed_count += 1
-                except (json.JSONDecodeError, AttributeError) as e:
-                    log.error(
-                        f"Failed to parse tool call '{getattr(tool_call.function, 'name', 'unknown')}': {e}"
-                    )
-                    continue
-
-            # 检查是否至少解析了一个工具调用
-            if parsed_count == 0 and message.tool_calls:
-                log.error(f"All {len(message.tool_calls)} tool calls failed to parse")
-                # 如果没有文本内容且所有工具调用都失败，这是一个严重错误
-                if not message.content:
-                    raise ValueError(
-                        f"All {len(message.tool_calls)} tool calls failed to parse and no content available"
-                    )
-
-            if parts:
-                contents.append({"role": role, "parts": parts})
-            continue
-
-        # 处理普通内容
-        if isinstance(message.content, list):
-            parts = []
-            for part in message.content:
-                if part.get("type") == "text":
-                    parts.append({"text": part.get("text", "")})
-                elif part.get("type") == "image_url":
-                    image_url = part.get("image_url", {}).get("url")
-                    if image_url:
-                        # 解析数据URI: "data:image/jpeg;base64,{base64_image}"
-                        try:
-                            mime_type, base64_data = image_url.split(";")
-                            _, mime_type = mime_type.split(":")
-                            _, base64_data = base64_data.split(",")
-                            parts.append(
-                                {
-                                    "inlineData": {
-                                        "mimeType": mime_type,
-                                        "data": base64_data,
-                                    }
-                                }
-                            )
-                        except ValueError:
-                            continue
-            contents.append({"role": role, "parts": parts})
-            # log.debug(f"Added message to contents: role={role}, parts={parts}")
-        elif message.content:
-            # 简单文本内容
-            contents.append({"role": role, "parts": [{"text": message.content}]})
-            # log.debug(f"Added message to contents: role={role}, content={message.content}")
+    contents = state.contents
+    system_instructions = state.system_instructions
 
     # 将OpenAI生成参数映射到Gemini格式
     generation_config = {}
@@ -243,6 +346,26 @@ async def openai_request_to_gemini_payload(
     return {"model": get_base_model_name(openai_request.model), "request": request_data}
 
 
+async def openai_request_to_gemini_payload(
+    openai_request: ChatCompletionRequest,
+) -> Dict[str, Any]:
+    """
+    将OpenAI聊天完成请求直接转换为完整的Gemini API payload格式
+
+    只有兼容性模式的配置读取需要异步，其余工作在同步核心
+    _openai_request_to_gemini_payload_sync 中完成。
+
+    Args:
+        openai_request: OpenAI格式请求对象
+
+    Returns:
+        完整的Gemini API payload，包含model和request字段
+    """
+    # 检查是否启用兼容性模式
+    compatibility_mode = await get_compatibility_mode_enabled()
+    return _openai_request_to_gemini_payload_sync(openai_request, compatibility_mode)
+
+
 def _extract_content_and_reasoning(parts: list) -> tuple:
     """从Gemini响应部件中提取内容和推理内容"""
     content = ""
@@ -315,14 +438,8 @@ def gemini_response_to_openai(gemini_response: Dict[str, Any], model: str) -> Di
         # 提取并分离thinking tokens和常规内容
         parts = candidate.get("content", {}).get("parts", [])
 
-        # 提取工具调用和文本内容
-        tool_calls, text_content = extract_tool_calls_from_parts(parts)
-
-        # 提取 reasoning content (thinking tokens)
-        reasoning_content = ""
-        for part in parts:
-            if part.get("thought", False) and "text" in part:
-                reasoning_content += part["text"]
+        # 单次遍历提取工具调用、文本内容和 reasoning content (thinking tokens)
+        tool_calls, text_content, reasoning_content = extract_tool_calls_from_parts(parts)
 
         # 构建消息对象
         message = {"role": role}
@@ -393,14 +510,10 @@ def gemini_stream_chunk_to_openai(
         # 提取并分离thinking tokens和常规内容
         parts = candidate.get("content", {}).get("parts", [])
 
-        # 提取工具调用和文本内容（流式响应需要 index 字段）
-        tool_calls, text_content = extract_tool_calls_from_parts(parts, is_streaming=True)
-
-        # 提取 reasoning content
-        reasoning_content = ""
-        for part in parts:
-            if part.get("thought", False) and "text" in part:
-                reasoning_content += part["text"]
+        # 单次遍历提取工具调用、文本内容和 reasoning content（流式需要 index 字段）
+        tool_calls, text_content, reasoning_content = extract_tool_calls_from_parts(
+            parts, is_streaming=True
+        )
 
         # 构建delta对象
         delta = {}
@@ -485,7 +598,12 @@ def validate_openai_request(request_data: Dict[str, Any]) -> ChatCompletionReque
         ValueError: 当请求数据无效时
     """
     try:
-        return ChatCompletionRequest(**request_data)
+        # model_validate 直接进入 pydantic-core 校验，
+        # 省去 **kwargs 展开再映射回字段的 Python 层开销
+        # （pydantic v1 没有 model_validate，回退到等价的 parse_obj）
+        if hasattr(ChatCompletionRequest, "model_validate"):
+            return ChatCompletionRequest.model_validate(request_data)
+        return ChatCompletionRequest.parse_obj(request_data)
     except Exception as e:
         raise ValueError(f"Invalid OpenAI request format: {str(e)}")
 
@@ -583,7 +701,35 @@ def extract_model_settings(model: str) -> Dict[str, Any]:
 
 # ==================== Tool Conversion Functions ====================
 
+# 预编译的函数名规范化正则（模块加载时编译一次）
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+_INVALID_CHARS_RE = re.compile(r"[^a-zA-Z0-9_.\-]")
+_MULTI_UNDERSCORE_RE = re.compile(r"_+")
+
+
+@functools.lru_cache(maxsize=2048)
+def _to_pinyin(name: str) -> str:
+    """将名称中的中文字符转换为拼音（按原始名称缓存）"""
+    funcs = _load_pypinyin()
+    if not funcs:
+        log.warning("pypinyin not installed, cannot convert Chinese characters to pinyin")
+        return name
+    lazy_pinyin, style = funcs
+
+    # 将中文转换为拼音，用下划线连接多音字
+    parts = []
+    for char in name:
+        if "\u4e00" <= char <= "\u9fff":
+            # 中文字符，转换为拼音
+            pinyin = lazy_pinyin(char, style=style.NORMAL)
+            parts.append("".join(pinyin))
+        else:
+            # 非中文字符，保持不变
+            parts.append(char)
+    return "".join(parts)
+
 
+@functools.lru_cache(maxsize=4096)
 def _normalize_function_name(name: str) -> str:
     """
     规范化函数名以符合 Gemini API 要求
@@ -606,37 +752,21 @@ def _normalize_function_name(name: str) -> str:
     Returns:
         规范化后的函数名
     """
-    import re
-
     if not name:
         return "_unnamed_function"
 
     # 第零步：检测并转换中文字符为拼音
-    # 检查是否包含中文字符
-    if re.search(r"[\u4e00-\u9fff]", name):
-        try:
-            from pypinyin import lazy_pinyin, Style
-
-            # 将中文转换为拼音，用下划线连接多音字
-            parts = []
-            for char in name:
-                if "\u4e00" <= char <= "\u9fff":
-                    # 中文字符，转换为拼音
-                    pinyin = lazy_pinyin(char, style=Style.NORMAL)
-                    parts.append("".join(pinyin))
-                else:
-                    # 非中文字符，保持不变
-                    parts.append(char)
-            normalized = "".join(parts)
-        except ImportError:
-            log.warning("pypinyin not installed, cannot convert Chinese characters to pinyin")
-            normalized = name
+    # ASCII 快速路径：纯ASCII名称不可能包含中文，跳过CJK正则扫描
+    if name.isascii():
+        normalized = name
+    elif _CJK_RE.search(name):
+        normalized = _to_pinyin(name)
     else:
         normalized = name
 
     # 第一步：将非法字符替换为下划线
     # 保留：a-z, A-Z, 0-9, 下划线, 点, 短横线
-    normalized = re.sub(r"[^a-zA-Z0-9_.\-]", "_", normalized)
+    normalized = _INVALID_CHARS_RE.sub("_", normalized)
 
     # 第二步：如果以非字母/下划线开头，处理首字符
     prefix_added = False
@@ -650,7 +780,7 @@ def _normalize_function_name(name: str) -> str:
         prefix_added = True
 
     # 第三步：合并连续的下划线
-    normalized = re.sub(r"_+", "_", normalized)
+    normalized = _MULTI_UNDERSCORE_RE.sub("_", normalized)
 
     # 第四步：移除首尾的下划线
     # 如果原本就是下划线开头，或者我们添加了前缀，则保留开头的下划线
@@ -745,6 +875,43 @@ def _clean_schema_for_gemini(schema: Any) -> Any:
     return cleaned
 
 
+@functools.lru_cache(maxsize=512)
+def _convert_tool_declaration(frozen_spec: str) -> Dict[str, Any]:
+    """
+    按规范化JSON串缓存单个工具的 Gemini functionDeclaration 转换结果
+
+    客户端通常每轮都重复发送相同的工具定义，名称规范化和 schema 清理
+    只需对每个唯一定义做一次。返回的字典为缓存共享对象，调用方不得原地修改。
+    """
+    function = _json_loads(frozen_spec)
+
+    # 获取并规范化函数名
+    original_name = function.get("name")
+    if not original_name:
+        log.warning("Tool missing 'name' field, using default")
+        original_name = "_unnamed_function"
+
+    normalized_name = _normalize_function_name(original_name)
+
+    # 如果名称被修改了，记录日志
+    if normalized_name != original_name:
+        log.info(f"Function name normalized: '{original_name}' -> '{normalized_name}'")
+
+    # 构建 Gemini function declaration
+    declaration = {
+        "name": normalized_name,
+        "description": function.get("description", ""),
+    }
+
+    # 添加参数（如果有）- 清理不支持的 schema 字段
+    if "parameters" in function:
+        cleaned_params = _clean_schema_for_gemini(function["parameters"])
+        if cleaned_params:
+            declaration["parameters"] = cleaned_params
+
+    return declaration
+
+
 def convert_openai_tools_to_gemini(openai_tools: List) -> List[Dict[str, Any]]:
     """
     将 OpenAI tools 格式转换为 Gemini functionDeclarations 格式
@@ -778,31 +945,9 @@ def convert_openai_tools_to_gemini(openai_tools: List) -> List[Dict[str, Any]]:
             log.warning("Tool missing 'function' field")
             continue
 
-        # 获取并规范化函数名
-        original_name = function.get("name")
-        if not original_name:
-            log.warning("Tool missing 'name' field, using default")
-            original_name = "_unnamed_function"
-
-        normalized_name = _normalize_function_name(original_name)
-
-        # 如果名称被修改了，记录日志
-        if normalized_name != original_name:
-            log.info(f"Function name normalized: '{original_name}' -> '{normalized_name}'")
-
-        # 构建 Gemini function declaration
-        declaration = {
-            "name": normalized_name,
-            "description": function.get("description", ""),
-        }
-
-        # 添加参数（如果有）- 清理不支持的 schema 字段
-        if "parameters" in function:
-            cleaned_params = _clean_schema_for_gemini(function["parameters"])
-            if cleaned_params:
-                declaration["parameters"] = cleaned_params
-
-        function_declarations.append(declaration)
+        # 以排序后的JSON串为键走缓存，重复出现的定义直接命中
+        frozen_spec = _canonical_dumps(function)
+        function_declarations.append(_convert_tool_declaration(frozen_spec))
 
     if not function_declarations:
         return []
@@ -811,10 +956,21 @@ def convert_openai_tools_to_gemini(openai_tools: List) -> List[Dict[str, Any]]:
     return [{"functionDeclarations": function_declarations}]
 
 
+# OpenAI tool_choice 字符串对应的 toolConfig 单例：结构固定且下游只读，
+# 导入时构建一次，热路径零分配（调用方不得原地修改）
+_TOOL_CHOICE_CONFIGS = {
+    "auto": {"functionCallingConfig": {"mode": "AUTO"}},
+    "none": {"functionCallingConfig": {"mode": "NONE"}},
+    "required": {"functionCallingConfig": {"mode": "ANY"}},
+}
+
+
 def convert_tool_choice_to_tool_config(tool_choice: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
     """
     将 OpenAI tool_choice 转换为 Gemini toolConfig
 
+    字符串模式返回共享的单例配置对象，调用方只应读取/序列化。
+
     Args:
         tool_choice: OpenAI 格式的 tool_choice
 
@@ -822,12 +978,9 @@ def convert_tool_choice_to_tool_config(tool_choice: Union[str, Dict[str, Any]])
         Gemini 格式的 toolConfig
     """
     if isinstance(tool_choice, str):
-        if tool_choice == "auto":
-            return {"functionCallingConfig": {"mode": "AUTO"}}
-        elif tool_choice == "none":
-            return {"functionCallingConfig": {"mode": "NONE"}}
-        elif tool_choice == "required":
-            return {"functionCallingConfig": {"mode": "ANY"}}
+        config = _TOOL_CHOICE_CONFIGS.get(tool_choice)
+        if config is not None:
+            return config
     elif isinstance(tool_choice, dict):
         # {"type": "function", "function": {"name": "my_function"}}
         if tool_choice.get("type") == "function":
@@ -841,16 +994,30 @@ def convert_tool_choice_to_tool_config(tool_choice: Union[str, Dict[str, Any]])
                 }
 
     # 默认返回 AUTO 模式
-    return {"functionCallingConfig": {"mode": "AUTO"}}
+    return _TOOL_CHOICE_CONFIGS["auto"]
 
 
-def convert_tool_message_to_function_response(message, all_messages: List = None) -> Dict[str, Any]:
+def _build_id_to_name_index(messages: List) -> Dict[str, str]:
+    """单次前向遍历建立 tool_call_id -> 函数名 索引"""
+    return {
+        tool_call.id: tool_call.function.name
+        for msg in messages
+        if getattr(msg, "role", None) == "assistant" and getattr(msg, "tool_calls", None)
+        for tool_call in msg.tool_calls
+        if tool_call.id
+    }
+
+
+def convert_tool_message_to_function_response(
+    message, all_messages: List = None, id_to_name: Dict[str, str] = None
+) -> Dict[str, Any]:
     """
     将 OpenAI 的 tool role 消息转换为 Gemini functionResponse
 
     Args:
         message: OpenAI 格式的工具消息
-        all_messages: 所有消息的列表，用于在缺少 name 时查找对应的 tool_call
+        all_messages: 所有消息的列表，未提供 id_to_name 时用于建立索引
+        id_to_name: 预先建立的 tool_call_id -> 函数名 索引，直接 O(1) 查找
 
     Returns:
         Gemini 格式的 functionResponse part
@@ -863,28 +1030,20 @@ def convert_tool_message_to_function_response(message, all_messages: List = None
     if hasattr(message, "name") and message.name:
         name = message.name
     else:
-        # 尝试从历史消息中查找对应的 tool_call
         tool_call_id = getattr(message, "tool_call_id", None)
-        if tool_call_id and all_messages:
-            # 遍历历史消息，查找包含此 tool_call_id 的 assistant 消息
-            for hist_msg in all_messages:
-                if (
-                    hasattr(hist_msg, "role")
-                    and hist_msg.role == "assistant"
-                    and hasattr(hist_msg, "tool_calls")
-                    and hist_msg.tool_calls
-                ):
-                    # 在 tool_calls 中查找匹配的 id
-                    for tool_call in hist_msg.tool_calls:
-                        if tool_call.id == tool_call_id:
-                            name = tool_call.function.name
-                            log.info(
-                                f"Tool message missing 'name' field, "
-                                f"inferred from history: {name} (tool_call_id={tool_call_id})"
-                            )
-                            break
-                    if name:
-                        break
+
+        if tool_call_id:
+            # 未传入索引时按需建立一次（线性），取代旧的逐条回扫
+            if id_to_name is None and all_messages:
+                id_to_name = _build_id_to_name_index(all_messages)
+
+            if id_to_name:
+                name = id_to_name.get(tool_call_id)
+                if name:
+                    log.info(
+                        f"Tool message missing 'name' field, "
+                        f"inferred from history: {name} (tool_call_id={tool_call_id})"
+                    )
 
         # 如果仍然没有找到 name
         if not name:
@@ -903,7 +1062,7 @@ def convert_tool_message_to_function_response(message, all_messages: List = None
     try:
         # 尝试将 content 解析为 JSON
         response_data = (
-            json.loads(message.content) if isinstance(message.content, str) else message.content
+            _json_loads(message.content) if isinstance(message.content, str) else message.content
         )
     except (json.JSONDecodeError, TypeError):
         # 如果不是有效的 JSON，包装为对象
@@ -914,39 +1073,78 @@ def convert_tool_message_to_function_response(message, all_messages: List = None
 
 def extract_tool_calls_from_parts(
     parts: List[Dict[str, Any]], is_streaming: bool = False
-) -> Tuple[List[Dict[str, Any]], str]:
+) -> Tuple[List[Dict[str, Any]], str, str]:
     """
-    从 Gemini response parts 中提取工具调用和文本内容
+    从 Gemini response parts 中单次遍历提取工具调用、文本内容和推理内容
 
     Args:
         parts: Gemini response 的 parts 数组
         is_streaming: 是否为流式响应（流式响应需要添加 index 字段）
 
     Returns:
-        (tool_calls, text_content) 元组
+        (tool_calls, text_content, reasoning_content) 元组
     """
     tool_calls = []
     text_content = ""
+    reasoning_content = ""
 
     for idx, part in enumerate(parts):
-        # 检查是否是函数调用
-        if "functionCall" in part:
-            function_call = part["functionCall"]
+        # 检查是否是函数调用（get一次拿到值，省去成员检查+取值的双重哈希）
+        function_call = part.get("functionCall")
+        if function_call is not None:
+            # args 已是字符串时直接透传，跳过一次编码
+            args = function_call.get("args", {})
             tool_call = {
                 "id": f"call_{uuid.uuid4().hex[:24]}",
                 "type": "function",
                 "function": {
                     "name": function_call.get("name"),
-                    "arguments": json.dumps(function_call.get("args", {})),
+                    "arguments": args if isinstance(args, str) else _json_dumps(args),
                 },
             }
             # 流式响应需要 index 字段
             if is_streaming:
                 tool_call["index"] = idx
             tool_calls.append(tool_call)
+            continue
 
-        # 提取文本内容（排除 thinking tokens）
-        elif "text" in part and not part.get("thought", False):
-            text_content += part["text"]
-
-    return tool_calls, text_content
+        # 同一次遍历中分流文本和 thinking tokens，免去调用方的二次扫描
+        text = part.get("text")
+        if text is not None:
+            if part.get("thought", False):
+                reasoning_content += text
+            else:
+                text_content += text
+
+    return tool_calls, text_content, reasoning_content
+
+
+# ==================== 可选的导入时预热 ====================
+
+# CPython 自适应解释器的字节码特化在约64次调用后才稳定；设置
+# OPENAI_TRANSFER_WARMUP=1 可在导入时用代表性输入预热转换热路径，
+# 让首个真实请求直接命中已特化的字节码
+if os.environ.get("OPENAI_TRANSFER_WARMUP"):
+    _WARMUP_TOOLS = [
+        {
+            "type": "function",
+            "function": {
+                "name": "get_weather",
+                "description": "Get the weather for a city",
+                "parameters": {
+                    "type": "object",
+                    "properties": {"city": {"type": "string"}},
+                    "required": ["city"],
+                },
+            },
+        }
+    ]
+    _WARMUP_PARTS = [
+        {"text": "ok"},
+        {"functionCall": {"name": "get_weather", "args": {"city": "北京"}}},
+    ]
+    for _ in range(100):
+        convert_openai_tools_to_gemini(_WARMUP_TOOLS)
+        convert_tool_choice_to_tool_config("auto")
+        extract_tool_calls_from_parts(_WARMUP_PARTS, is_streaming=True)
+    del _WARMUP_TOOLS, _WARMUP_PARTS
@@ -7,7 +7,9 @@ import asyncio
 import datetime
 import io
 import json
+import mmap
 import os
+import re
 import time
 import zipfile
 import shutil
@@ -25,7 +27,12 @@ from fastapi import (
     WebSocketDisconnect,
     Request,
 )
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    FileResponse,
+    Response,
+)
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from starlette.websockets import WebSocketState
@@ -33,6 +40,26 @@ import toml
 import zipfile
 import httpx
 
+try:
+    # 基于内核文件事件（Linux inotify / macOS FSEvents）的异步通知，
+    # 用于日志尾随推送；不可用时回退到定时轮询
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
+
+try:
+    # orjson 序列化大响应体比标准库快数倍；Termux 等环境可能装不上，
+    # 缺失时回退到标准 JSONResponse（不用 FastAPI 自带的
+    # ORJSONResponse：其已弃用且每次响应都发 DeprecationWarning）
+    import orjson as _orjson
+
+    class ORJSONResponse(JSONResponse):
+        def render(self, content: object) -> bytes:
+            return _orjson.dumps(content)
+
+except ImportError:
+    ORJSONResponse = JSONResponse
+
 import config
 from log import log
 from .auth import (
@@ -47,15 +74,49 @@ from .auth import (
     clear_env_credentials,
 )
 from .credential_manager import CredentialManager
+from .ip_manager import get_ip_manager
 from .storage_adapter import get_storage_adapter
 
 # 创建路由器
 router = APIRouter()
 security = HTTPBearer()
 
+# 日志文件路径在进程生命周期内不变，模块加载时解析一次，
+# 避免每个请求重复的环境变量查找和字符串分配
+LOG_FILE_PATH = os.getenv("LOG_FILE", "log.txt")
+LOG_FILE_BASENAME = os.path.basename(LOG_FILE_PATH)
+
 # 创建credential manager实例
 credential_manager = CredentialManager()
 
+# /config/get 返回的静态配置项（键名 -> 异步getter）
+# 集中定义后可用 asyncio.gather 一次性并发获取，避免逐项 await
+_CONFIG_GETTERS = (
+    ("code_assist_endpoint", config.get_code_assist_endpoint),
+    ("credentials_dir", config.get_credentials_dir),
+    ("proxy", config.get_proxy_config),
+    ("oauth_proxy_url", config.get_oauth_proxy_url),
+    ("googleapis_proxy_url", config.get_googleapis_proxy_url),
+    ("resource_manager_api_url", config.get_resource_manager_api_url),
+    ("service_usage_api_url", config.get_service_usage_api_url),
+    ("antigravity_api_endpoint", config.get_antigravity_api_endpoint),
+    ("antigravity_models_endpoint", config.get_antigravity_models_endpoint),
+    ("antigravity_oauth_endpoint", config.get_antigravity_oauth_endpoint),
+    ("auto_ban_enabled", config.get_auto_ban_enabled),
+    ("auto_ban_error_codes", config.get_auto_ban_error_codes),
+    ("calls_per_rotation", config.get_calls_per_rotation),
+    ("retry_429_max_retries", config.get_retry_429_max_retries),
+    ("retry_429_enabled", config.get_retry_429_enabled),
+    ("retry_429_interval", config.get_retry_429_interval),
+    ("anti_truncation_max_attempts", config.get_anti_truncation_max_attempts),
+    ("compatibility_mode_enabled", config.get_compatibility_mode_enabled),
+    ("host", config.get_server_host),
+    ("port", config.get_server_port),
+    ("api_password", config.get_api_password),
+    ("panel_password", config.get_panel_password),
+    ("password", config.get_server_password),
+)
+
 
 def get_client_ip(request: Request) -> str:
     """
@@ -294,8 +355,13 @@ async def cleanup_old_backups(backup_dir: str, max_count: int):
 async def backup_creds_before_delete():
     """
     在删除凭证文件前备份 creds.toml 文件
-    备份格式：creds_{删除后剩余凭证数}_{时间戳}.toml.bak
+    备份格式：creds_{时间戳}.toml.bak
     保存路径：creds/backup/
+
+    文件拷贝必须在删除之前完成（文件后端的凭证就存在这份 creds.toml
+    里），所以拷贝留在响应路径上同步执行——这是一个小的本地文件，
+    开销可忽略。慢的部分（统计剩余凭证数、清理旧备份）放到后台任务，
+    不阻塞删除请求的响应；文件名保持不变，与响应中报告的一致。
     """
     try:
         # 获取凭证目录
@@ -313,23 +379,16 @@ async def backup_creds_before_delete():
         # 确保备份目录存在
         os.makedirs(backup_dir, exist_ok=True)
 
-        # 获取当前凭证文件数量（删除后会减1）
-        storage_adapter = await get_storage_adapter()
-        all_creds = await storage_adapter.list_credentials()
-        creds_count_after_delete = len(all_creds) - 1 if all_creds else 0
-
         # 生成备份文件名
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        backup_filename = f"creds_{creds_count_after_delete}_{timestamp}.toml.bak"
-        backup_path = os.path.join(backup_dir, backup_filename)
-
-        # 复制 creds.toml 文件
+        backup_path = os.path.join(backup_dir, f"creds_{timestamp}.toml.bak")
         shutil.copy2(creds_toml_path, backup_path)
         log.info(f"creds.toml backup created: {backup_path}")
 
-        # 清理旧备份
-        max_backup_count = await config.get_max_backup_count()
-        await cleanup_old_backups(backup_dir, max_backup_count)
+        # 慢路径后移：查询凭证数（Mongo/Redis 后端可能较慢）和清理旧备份
+        task = asyncio.create_task(_finalize_backup(backup_dir, backup_path))
+        _pending_backup_tasks.add(task)
+        task.add_done_callback(_pending_backup_tasks.discard)
 
         return backup_path
 
@@ -339,6 +398,30 @@ async def backup_creds_before_delete():
         return None
 
 
+# 进行中的后台备份收尾任务（保持强引用，避免任务被垃圾回收后出现
+# "task was destroyed but it is pending" 警告）
+_pending_backup_tasks: set = set()
+
+
+async def _finalize_backup(backup_dir: str, backup_path: str):
+    """后台记录剩余凭证数并清理旧备份（不改动已报告的备份文件名）"""
+    try:
+        # 此时删除通常已执行，当前凭证数即"删除后剩余数"（尽力而为）
+        storage_adapter = await get_storage_adapter()
+        all_creds = await storage_adapter.list_credentials()
+        creds_count = len(all_creds) if all_creds else 0
+        log.info(
+            f"Credentials remaining after delete: {creds_count} "
+            f"(backup: {os.path.basename(backup_path)})"
+        )
+
+        # 清理旧备份
+        max_backup_count = await config.get_max_backup_count()
+        await cleanup_old_backups(backup_dir, max_backup_count)
+    except Exception as e:
+        log.error(f"Failed to finalize creds.toml backup: {e}")
+
+
 def is_mobile_user_agent(user_agent: str) -> bool:
     """检测是否为移动设备用户代理"""
     if not user_agent:
@@ -1015,7 +1098,7 @@ async def creds_action(request: CredFileActionRequest, token: str = Depends(veri
         elif action == "delete":
             # 这个操作只在24小时后由系统自动调用
             try:
-                # 在删除前备份 creds.toml 文件
+                # 在删除前备份 creds.toml 文件（拷贝同步完成，收尾在后台）
                 backup_path = await backup_creds_before_delete()
                 if backup_path:
                     log.info(f"creds.toml backed up to: {backup_path}")
@@ -1071,7 +1154,7 @@ async def creds_batch_action(
             if request.admin_password != correct_admin_password:
                 raise HTTPException(status_code=403, detail="管理员密码错误")
 
-            # 在批量删除前备份配置文件
+            # 在批量删除前备份配置文件（拷贝同步完成，收尾在后台）
             backup_path = await backup_creds_before_delete()
             backup_info = os.path.basename(backup_path) if backup_path else None
             if backup_path:
@@ -1283,22 +1366,6 @@ async def get_config(token: str = Depends(verify_token)):
         current_config = {}
         env_locked = []
 
-        # 基础配置
-        current_config["code_assist_endpoint"] = await config.get_code_assist_endpoint()
-        current_config["credentials_dir"] = await config.get_credentials_dir()
-        current_config["proxy"] = await config.get_proxy_config() or ""
-
-        # GeminiCLI 代理端点配置
-        current_config["oauth_proxy_url"] = await config.get_oauth_proxy_url()
-        current_config["googleapis_proxy_url"] = await config.get_googleapis_proxy_url()
-        current_config["resource_manager_api_url"] = await config.get_resource_manager_api_url()
-        current_config["service_usage_api_url"] = await config.get_service_usage_api_url()
-
-        # Antigravity 端点配置
-        current_config["antigravity_api_endpoint"] = await config.get_antigravity_api_endpoint()
-        current_config["antigravity_models_endpoint"] = await config.get_antigravity_models_endpoint()
-        current_config["antigravity_oauth_endpoint"] = await config.get_antigravity_oauth_endpoint()
-
         # 检查环境变量锁定状态
         if os.getenv("CODE_ASSIST_ENDPOINT"):
             env_locked.append("code_assist_endpoint")
@@ -1321,10 +1388,6 @@ async def get_config(token: str = Depends(verify_token)):
         if os.getenv("ANTIGRAVITY_OAUTH_ENDPOINT"):
             env_locked.append("antigravity_oauth_endpoint")
 
-        # 自动封禁配置
-        current_config["auto_ban_enabled"] = await config.get_auto_ban_enabled()
-        current_config["auto_ban_error_codes"] = await config.get_auto_ban_error_codes()
-
         # 检查环境变量锁定状态
         if os.getenv("AUTO_BAN"):
             env_locked.append("auto_ban_enabled")
@@ -1347,28 +1410,11 @@ async def get_config(token: str = Depends(verify_token)):
             if key not in env_locked and key not in SENSITIVE_FIELDS:
                 current_config[key] = value
 
-        # 性能配置
-        current_config["calls_per_rotation"] = await config.get_calls_per_rotation()
-
-        # 429重试配置
-        current_config["retry_429_max_retries"] = await config.get_retry_429_max_retries()
-        current_config["retry_429_enabled"] = await config.get_retry_429_enabled()
-        current_config["retry_429_interval"] = await config.get_retry_429_interval()
-
-        # 抗截断配置
-        current_config["anti_truncation_max_attempts"] = (
-            await config.get_anti_truncation_max_attempts()
-        )
-
-        # 兼容性配置
-        current_config["compatibility_mode_enabled"] = await config.get_compatibility_mode_enabled()
-
-        # 服务器配置
-        current_config["host"] = await config.get_server_host()
-        current_config["port"] = await config.get_server_port()
-        current_config["api_password"] = await config.get_api_password()
-        current_config["panel_password"] = await config.get_panel_password()
-        current_config["password"] = await config.get_server_password()
+        # 并发获取所有静态配置项（getter优先级：环境变量 > 存储 > 默认值）
+        keys = tuple(key for key, _ in _CONFIG_GETTERS)
+        values = await asyncio.gather(*(getter() for _, getter in _CONFIG_GETTERS))
+        current_config.update(zip(keys, values))
+        current_config["proxy"] = current_config["proxy"] or ""
 
         # 检查其他环境变量锁定状态
         if os.getenv("RETRY_429_MAX_RETRIES"):
@@ -1787,8 +1833,7 @@ async def get_env_creds_status(token: str = Depends(verify_token)):
 async def clear_logs(token: str = Depends(verify_token)):
     """清空日志文件"""
     try:
-        # 直接使用环境变量获取日志文件路径
-        log_file_path = os.getenv("LOG_FILE", "log.txt")
+        log_file_path = LOG_FILE_PATH
 
         # 检查日志文件是否存在
         if os.path.exists(log_file_path):
@@ -1802,14 +1847,14 @@ async def clear_logs(token: str = Depends(verify_token)):
                 # 通知所有WebSocket连接日志已清空
                 await manager.broadcast("--- 日志文件已清空 ---")
 
-                return JSONResponse(
-                    content={"message": f"日志文件已清空: {os.path.basename(log_file_path)}"}
+                return ORJSONResponse(
+                    content={"message": f"日志文件已清空: {LOG_FILE_BASENAME}"}
                 )
             except Exception as e:
                 log.error(f"清空日志文件失败: {e}")
                 raise HTTPException(status_code=500, detail=f"清空日志文件失败: {str(e)}")
         else:
-            return JSONResponse(content={"message": "日志文件不存在"})
+            return ORJSONResponse(content={"message": "日志文件不存在"})
 
     except Exception as e:
         log.error(f"清空日志文件失败: {e}")
@@ -1820,16 +1865,16 @@ async def clear_logs(token: str = Depends(verify_token)):
 async def download_logs(token: str = Depends(verify_token)):
     """下载日志文件"""
     try:
-        # 直接使用环境变量获取日志文件路径
-        log_file_path = os.getenv("LOG_FILE", "log.txt")
+        log_file_path = LOG_FILE_PATH
 
-        # 检查日志文件是否存在
-        if not os.path.exists(log_file_path):
+        # 单次stat同时完成存在性和大小检查
+        try:
+            stat_result = os.stat(log_file_path)
+        except OSError:
             raise HTTPException(status_code=404, detail="日志文件不存在")
 
         # 检查文件是否为空
-        file_size = os.path.getsize(log_file_path)
-        if file_size == 0:
+        if stat_result.st_size == 0:
             raise HTTPException(status_code=404, detail="日志文件为空")
 
         # 生成文件名（包含时间戳）
@@ -1838,11 +1883,14 @@ async def download_logs(token: str = Depends(verify_token)):
 
         log.info(f"下载日志文件: {log_file_path}")
 
+        # 传入 stat_result 让 Starlette 跳过重复stat；
+        # 底层传输在支持的事件循环上走 sendfile 零拷贝路径
         return FileResponse(
             path=log_file_path,
             filename=filename,
             media_type="text/plain",
             headers={"Content-Disposition": f"attachment; filename={filename}"},
+            stat_result=stat_result,
         )
 
     except HTTPException:
@@ -1852,6 +1900,203 @@ async def download_logs(token: str = Depends(verify_token)):
         raise HTTPException(status_code=500, detail=f"下载日志文件失败: {str(e)}")
 
 
+def _tail_lines(path: str, n: int = 50, block: int = 8192) -> List[str]:
+    """
+    从文件尾部按块反向读取，返回最后 n 行
+
+    只加载尾部所需的字节，避免把整个日志文件读入内存
+    （大日志下 readlines() 会占用 O(文件大小) 的内存）。
+
+    Args:
+        path: 文件路径
+        n: 需要的行数
+        block: 每次向前扩展的字节块大小
+
+    Returns:
+        最后 n 行（不含换行符），文件不存在或为空时返回空列表
+    """
+    try:
+        fsize = os.path.getsize(path)
+    except OSError:
+        return []
+
+    if fsize == 0:
+        return []
+
+    data = b""
+    with open(path, "rb") as f:
+        k = 1
+        while True:
+            offset = max(0, fsize - k * block)
+            f.seek(offset)
+            data = f.read(fsize - offset)
+            # 收集到足够的换行符或已到文件开头时停止
+            if data.count(b"\n") >= n or offset == 0:
+                break
+            k += 1
+
+    return data.decode("utf-8", errors="replace").splitlines()[-n:]
+
+
+# 共享日志尾部广播：所有WebSocket连接复用同一个读取任务，
+# K个客户端时磁盘只读一次（O(1) I/O），再经 manager.broadcast 扇出
+_log_tail_task: Optional[asyncio.Task] = None
+
+
+def _ensure_log_tail_broadcaster():
+    """懒启动共享的日志尾部广播任务（首个连接触发，进程内常驻）"""
+    global _log_tail_task
+    if _log_tail_task is None or _log_tail_task.done():
+        _log_tail_task = asyncio.create_task(_log_tail_broadcaster())
+
+
+async def _log_tail_broadcaster():
+    """后台任务：单点读取日志新增内容并广播给所有已连接客户端"""
+    log_file_path = LOG_FILE_PATH
+    max_read_size = 8192  # 限制单次读取大小为8KB，防止大量日志造成内存激增
+    check_interval = 2  # watchfiles 不可用时的轮询间隔
+
+    try:
+        last_size = os.path.getsize(log_file_path)
+    except OSError:
+        last_size = 0
+
+    # 单次追平（drain）期间复用的只读内存映射，替代每次读取的
+    # open/seek/read/close；追平后立即关闭：Windows 上被映射的文件
+    # 无法截断（clear_logs 会因 ERROR_USER_MAPPED_FILE 失败），空闲时
+    # 不持有映射也消除了外部截断（logrotate 等）引发 SIGBUS 的窗口
+    tail_file = None
+    tail_mmap = None
+
+    def close_tail_map():
+        nonlocal tail_file, tail_mmap
+        if tail_mmap is not None:
+            try:
+                tail_mmap.close()
+            except Exception:
+                pass
+            tail_mmap = None
+        if tail_file is not None:
+            try:
+                tail_file.close()
+            except Exception:
+                pass
+            tail_file = None
+
+    def get_tail_map(current_size: int):
+        """返回覆盖当前文件大小的只读mmap；文件增长时重新映射"""
+        nonlocal tail_file, tail_mmap
+        if tail_mmap is None or len(tail_mmap) < current_size:
+            close_tail_map()
+            tail_file = open(log_file_path, "rb")
+            tail_mmap = mmap.mmap(tail_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return tail_mmap
+
+    async def broadcast_new_content():
+        """读取日志新增内容并广播给所有连接"""
+        nonlocal last_size
+
+        # 单次stat同时覆盖存在性和大小检查（exists+getsize要走两次系统调用）
+        try:
+            current_size = os.stat(log_file_path).st_size
+        except OSError:
+            return
+
+        if current_size > last_size:
+            # 限制读取大小，防止单次读取过多内容
+            read_size = min(current_size - last_size, max_read_size)
+
+            try:
+                mm = get_tail_map(current_size)
+                raw = mm[last_size : last_size + read_size]
+
+                if not raw:
+                    last_size = current_size
+                    return
+
+                # 字节级定位最后一个完整行边界：位置直接按字节推进，
+                # 无需解码后再重新编码计算长度，也避免多字节字符被
+                # 读取窗口截断后产生乱码（不完整的尾行留到下次处理）
+                last_nl = raw.rfind(b"\n") + 1
+                if last_nl == 0:
+                    if len(raw) < read_size:
+                        # 尚无完整行，等待后续写入
+                        return
+                    # 超长行占满整个读取窗口，整块发送以保证推进
+                    last_nl = len(raw)
+
+                complete = raw[:last_nl]
+                last_size += last_nl
+
+                # 字节级过滤空行并整体一次解码：空行不再经过UTF-8解码，
+                # N行只调用一次decode
+                kept = [
+                    line.rstrip()
+                    for line in complete.split(b"\n")
+                    if line and not line.isspace()
+                ]
+
+                # 本次读取的所有新行合并为一个WebSocket帧广播
+                if kept:
+                    await manager.broadcast(
+                        b"\n".join(kept).decode("utf-8", errors="replace")
+                    )
+            except Exception as e:
+                log.error(f"读取日志新增内容失败: {e}")
+                # 发生其他错误时，重置文件位置
+                last_size = current_size
+
+        # 如果文件被截断（如清空日志），重置位置并重新映射
+        elif current_size < last_size:
+            close_tail_map()
+            last_size = 0
+
+    async def drain_new_content():
+        """循环读取直到追平文件大小
+
+        broadcast_new_content 单次最多读 max_read_size；一次写入突发
+        超过该上限时必须继续读，否则剩余积压要等下一次文件事件才会
+        推送（日志安静时会无限期卡在积压中间）。
+        """
+        try:
+            while True:
+                prev = last_size
+                await broadcast_new_content()
+                try:
+                    current_size = os.stat(log_file_path).st_size
+                except OSError:
+                    return
+                # 已追平，或本轮没有推进（尾行不完整/读取出错），停止循环
+                if last_size >= current_size or last_size == prev:
+                    return
+        finally:
+            # 追平后关闭映射，下次事件时按需重新映射（见上方说明）
+            close_tail_map()
+
+    try:
+        while True:
+            try:
+                if awatch is not None and os.path.exists(log_file_path):
+                    # 内核事件驱动：日志无写入时协程完全挂起（零唤醒），
+                    # 有新内容时亚秒级推送，而不是最多等待2秒
+                    async for _changes in awatch(log_file_path):
+                        await drain_new_content()
+                    # awatch 正常退出（如文件被删除），稍后重试
+                    await asyncio.sleep(check_interval)
+                else:
+                    # 回退路径：定时轮询文件大小
+                    await asyncio.sleep(check_interval)
+                    await drain_new_content()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"日志广播任务异常: {e}")
+                close_tail_map()
+                await asyncio.sleep(check_interval)
+    finally:
+        close_tail_map()
+
+
 @router.websocket("/auth/logs/stream")
 async def websocket_logs(websocket: WebSocket):
     """WebSocket端点，用于实时日志流"""
@@ -1860,77 +2105,24 @@ async def websocket_logs(websocket: WebSocket):
         return
 
     try:
-        # 直接使用环境变量获取日志文件路径
-        log_file_path = os.getenv("LOG_FILE", "log.txt")
+        log_file_path = LOG_FILE_PATH
 
-        # 发送初始日志（限制为最后50行，减少内存占用）
+        # 发送初始日志（限制为最后50行，从文件尾部反向读取，避免整文件读入内存）
+        # 合并成单个WebSocket帧发送，避免每行一次帧封装+系统调用
         if os.path.exists(log_file_path):
             try:
-                with open(log_file_path, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                    # 只发送最后50行，减少初始内存消耗
-                    for line in lines[-50:]:
-                        if line.strip():
-                            await websocket.send_text(line.strip())
+                initial_lines = [
+                    line.strip() for line in _tail_lines(log_file_path, n=50) if line.strip()
+                ]
+                if initial_lines:
+                    await websocket.send_text("\n".join(initial_lines))
             except Exception as e:
                 await websocket.send_text(f"Error reading log file: {e}")
 
-        # 监控日志文件变化
-        last_size = os.path.getsize(log_file_path) if os.path.exists(log_file_path) else 0
-        max_read_size = 8192  # 限制单次读取大小为8KB，防止大量日志造成内存激增
-        check_interval = 2  # 增加检查间隔，减少CPU和I/O开销
-
-        while websocket.client_state == WebSocketState.CONNECTED:
-            await asyncio.sleep(check_interval)
-
-            if os.path.exists(log_file_path):
-                current_size = os.path.getsize(log_file_path)
-                if current_size > last_size:
-                    # 限制读取大小，防止单次读取过多内容
-                    read_size = min(current_size - last_size, max_read_size)
-
-                    try:
-                        with open(log_file_path, "r", encoding="utf-8", errors="replace") as f:
-                            f.seek(last_size)
-                            new_content = f.read(read_size)
-
-                            # 处理编码错误的情况
-                            if not new_content:
-                                last_size = current_size
-                                continue
-
-                            # 分行发送，避免发送不完整的行
-                            lines = new_content.splitlines(keepends=True)
-                            if lines:
-                                # 如果最后一行没有换行符，保留到下次处理
-                                if not lines[-1].endswith("\n") and len(lines) > 1:
-                                    # 除了最后一行，其他都发送
-                                    for line in lines[:-1]:
-                                        if line.strip():
-                                            await websocket.send_text(line.rstrip())
-                                    # 更新位置，但要退回最后一行的字节数
-                                    last_size += len(new_content.encode("utf-8")) - len(
-                                        lines[-1].encode("utf-8")
-                                    )
-                                else:
-                                    # 所有行都发送
-                                    for line in lines:
-                                        if line.strip():
-                                            await websocket.send_text(line.rstrip())
-                                    last_size += len(new_content.encode("utf-8"))
-                    except UnicodeDecodeError as e:
-                        # 遇到编码错误时，跳过这部分内容
-                        log.warning(f"WebSocket日志读取编码错误: {e}, 跳过部分内容")
-                        last_size = current_size
-                    except Exception as e:
-                        await websocket.send_text(f"Error reading new content: {e}")
-                        # 发生其他错误时，重置文件位置
-                        last_size = current_size
-
-                # 如果文件被截断（如清空日志），重置位置
-                elif current_size < last_size:
-                    last_size = 0
-                    await websocket.send_text("--- 日志已清空 ---")
+        # 新增内容由共享广播任务统一推送；本协程只负责感知客户端断开
+        _ensure_log_tail_broadcaster()
+        while True:
+            await websocket.receive_text()
 
     except WebSocketDisconnect:
         pass
@@ -1961,12 +2153,10 @@ async def get_ip_statistics(ip: Optional[str] = None, token: str = Depends(verif
         IP 统计数据
     """
     try:
-        from .ip_manager import get_ip_manager
-
         ip_manager = await get_ip_manager()
         stats = await ip_manager.get_ip_stats(ip)
 
-        return JSONResponse(content={"success": True, "data": stats})
+        return ORJSONResponse(content={"success": True, "data": stats})
     except Exception as e:
         log.error(f"获取 IP 统计失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1981,12 +2171,10 @@ async def get_ip_summary(token: str = Depends(verify_token)):
         IP 统计摘要（总数、活跃数、封禁数等）
     """
     try:
-        from .ip_manager import get_ip_manager
-
         ip_manager = await get_ip_manager()
         summary = await ip_manager.get_all_ips_summary()
 
-        return JSONResponse(content={"success": True, "data": summary})
+        return ORJSONResponse(content={"success": True, "data": summary})
     except Exception as e:
         log.error(f"获取 IP 摘要失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2004,8 +2192,6 @@ async def refresh_ip_location(ip: str, token: str = Depends(verify_token)):
         更新后的位置信息
     """
     try:
-        from .ip_manager import get_ip_manager
-
         ip_manager = await get_ip_manager()
         
         # 重新查询位置
@@ -2017,7 +2203,7 @@ async def refresh_ip_location(ip: str, token: str = Depends(verify_token)):
                 ip_manager._ip_cache["ips"][ip]["location"] = location
                 ip_manager._cache_dirty = True
         
-        return JSONResponse(content={"success": True, "location": location})
+        return ORJSONResponse(content={"success": True, "location": location})
     except Exception as e:
         log.error(f"刷新 IP 位置失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2051,8 +2237,6 @@ async def get_ip_ranking(
         分页的排名榜数据
     """
     try:
-        from .ip_manager import get_ip_manager
-
         ip_manager = await get_ip_manager()
         ranking_data = await ip_manager.get_ip_ranking(
             rank_by=rank_by,
@@ -2061,7 +2245,7 @@ async def get_ip_ranking(
             include_banned=include_banned
         )
 
-        return JSONResponse(content={"success": True, "data": ranking_data})
+        return ORJSONResponse(content={"success": True, "data": ranking_data})
     except Exception as e:
         log.error(f"获取 IP 排名榜失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2096,8 +2280,6 @@ async def update_ip_status(
         Success message
     """
     try:
-        from .ip_manager import get_ip_manager
-
         ip_manager = await get_ip_manager()
 
         # 获取操作者IP地址（支持反向代理）
@@ -2163,7 +2345,7 @@ async def update_ip_status(
             message = f"已将 IP {req.ip} 设置为{status_name}"
             if req.status == "rate_limited" and req.requests_per_minute:
                 message += f"（{req.requests_per_minute}次/分钟）"
-            return JSONResponse(content={"success": True, "message": message})
+            return ORJSONResponse(content={"success": True, "message": message})
         else:
             # 使用返回的错误信息
             raise HTTPException(status_code=400, detail=error_msg or "更新 IP 状态失败")
@@ -2178,10 +2360,72 @@ async def update_ip_status(
 # ==================== 留言板功能 ====================
 
 
+# 东八区时区对象（固定偏移，构造一次全局复用）
+CST8 = datetime.timezone(datetime.timedelta(hours=8))
+
+# 预编译的中文校验正则（每次提交复用，避免请求路径内重复编译）
+_CHINESE_RE = re.compile(r"[\u4e00-\u9fa5]")
+
+# 留言板文件路径缓存（credentials_dir 在进程运行期间不变，
+# 避免每次读写留言都异步查询一次配置）
+_guestbook_file_path: Optional[str] = None
+
+
 async def get_guestbook_file_path():
-    """获取留言板TOML文件路径"""
-    credentials_dir = await config.get_credentials_dir()
-    return os.path.join(credentials_dir, "guestbook.toml")
+    """获取留言板TOML文件路径（首次调用后缓存）"""
+    global _guestbook_file_path
+    if _guestbook_file_path is None:
+        credentials_dir = await config.get_credentials_dir()
+        _guestbook_file_path = os.path.join(credentials_dir, "guestbook.toml")
+    return _guestbook_file_path
+
+
+# 留言板内存缓存：启动后首次访问时从TOML加载一次，
+# 之后读取全部走内存，只有提交留言时才写盘
+_guestbook_cache: Optional[deque] = None
+_guestbook_lock = asyncio.Lock()
+
+
+async def _get_guestbook_cache() -> deque:
+    """获取留言缓存，首次访问时从TOML文件加载"""
+    global _guestbook_cache
+    if _guestbook_cache is None:
+        async with _guestbook_lock:
+            if _guestbook_cache is None:
+                messages = await load_guestbook_data()
+                _guestbook_cache = deque(messages, maxlen=200)
+    return _guestbook_cache
+
+
+# 落盘去抖：提交只置脏标记，由后台任务聚合突发写入，
+# 磁盘写入频率与提交速率解耦（最多约2次/秒）
+_guestbook_dirty = asyncio.Event()
+_guestbook_flush_task: Optional[asyncio.Task] = None
+_GUESTBOOK_FLUSH_DELAY = 0.5  # 秒
+
+
+async def _guestbook_flush_worker():
+    """后台留言落盘任务：等待脏标记，短暂聚合后一次性写盘"""
+    while True:
+        await _guestbook_dirty.wait()
+        await asyncio.sleep(_GUESTBOOK_FLUSH_DELAY)
+        _guestbook_dirty.clear()
+
+        async with _guestbook_lock:
+            messages = list(_guestbook_cache) if _guestbook_cache is not None else []
+
+        try:
+            await save_guestbook_data(messages)
+        except Exception as e:
+            log.error(f"Guestbook flush failed: {e}")
+
+
+def _mark_guestbook_dirty():
+    """标记留言有变更，并确保后台落盘任务已启动"""
+    global _guestbook_flush_task
+    if _guestbook_flush_task is None or _guestbook_flush_task.done():
+        _guestbook_flush_task = asyncio.create_task(_guestbook_flush_worker())
+    _guestbook_dirty.set()
 
 
 async def load_guestbook_data():
@@ -2212,14 +2456,24 @@ async def save_guestbook_data(messages):
         messages = messages[-100:]
         log.info(f"留言板清理：删除旧留言，保留最新100条")
 
-    data = {"messages": messages, "last_updated": datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=8))).isoformat()}
+    data = {"messages": messages, "last_updated": datetime.datetime.now(CST8).isoformat()}
 
+    # 先写临时文件再原子替换：写入中途崩溃不会损坏 guestbook.toml，
+    # fsync 保证断电后不丢失已确认的留言
+    tmp_file = guestbook_file + ".tmp"
     try:
-        with open(guestbook_file, "w", encoding="utf-8") as f:
+        with open(tmp_file, "w", encoding="utf-8") as f:
             toml.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, guestbook_file)
         return True
     except Exception as e:
         log.error(f"Failed to save guestbook: {e}")
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
         return False
 
 
@@ -2227,12 +2481,13 @@ async def save_guestbook_data(messages):
 async def get_guestbook_list(token: str = Depends(verify_token)):
     """获取留言板列表"""
     try:
-        messages = await load_guestbook_data()
+        # 直接读内存缓存，无磁盘I/O
+        messages = await _get_guestbook_cache()
 
         # 返回所有留言（最多200条），倒序排列（最新的在前面）
         messages_reversed = list(reversed(messages))
 
-        return JSONResponse(
+        return ORJSONResponse(
             content={"messages": messages_reversed, "count": len(messages_reversed)}
         )
 
@@ -2256,9 +2511,7 @@ async def submit_guestbook(request: GuestbookSubmitRequest, token: str = Depends
             raise HTTPException(status_code=400, detail="用户名最多20个字符")
 
         # 验证是否包含中文
-        import re
-
-        if not re.search(r"[\u4e00-\u9fa5]", username):
+        if not _CHINESE_RE.search(username):
             raise HTTPException(status_code=400, detail="用户名必须包含中文")
 
         # 验证留言内容
@@ -2268,26 +2521,28 @@ async def submit_guestbook(request: GuestbookSubmitRequest, token: str = Depends
         if len(message) > 200:
             raise HTTPException(status_code=400, detail="留言内容最多200个字符")
 
-        # 加载现有留言
-        messages = await load_guestbook_data()
-
         # 创建新留言
         new_message = {
             "username": username,
             "message": message,
             "emoji": request.emoji or "😃",
-            "timestamp": datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=8))).strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": datetime.datetime.now(CST8).strftime("%Y-%m-%d %H:%M:%S"),
         }
 
-        # 添加到列表
-        messages.append(new_message)
+        # 追加到内存缓存（与磁盘保存逻辑保持相同的清理规则）
+        cache = await _get_guestbook_cache()
+        async with _guestbook_lock:
+            cache.append(new_message)
+            if len(cache) >= 200:
+                trimmed = list(cache)[-100:]
+                cache.clear()
+                cache.extend(trimmed)
 
-        # 保存
-        if await save_guestbook_data(messages):
-            log.info(f"New guestbook message from {username}")
-            return JSONResponse(content={"success": True, "message": "留言发布成功"})
-        else:
-            raise HTTPException(status_code=500, detail="保存留言失败")
+        # 置脏标记，由后台任务聚合落盘（请求路径只做内存操作）
+        _mark_guestbook_dirty()
+
+        log.info(f"New guestbook message from {username}")
+        return ORJSONResponse(content={"success": True, "message": "留言发布成功"})
 
     except HTTPException:
         raise